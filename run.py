@@ -2,9 +2,22 @@ import tkinter as tk
 from tkinter import ttk
 import threading
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import random
 import os
+import sys
+import json
+import socket
+import sqlite3
+import getpass
+import argparse
+import csv
+import bisect
+import heapq
+import re
+import multiprocessing
+from collections import deque
+from array import array
 
 # Try to import optional dependencies but provide fallbacks if they're missing
 try:
@@ -12,17 +25,334 @@ try:
     PYNPUT_AVAILABLE = True
 except ImportError:
     PYNPUT_AVAILABLE = False
-    print("Warning: pynput module not found. Input tracking will be simulated.")
+    print("Warning: pynput module not found. Input tracking will be simulated.", file=sys.stderr)
 
 try:
     import psutil
     PSUTIL_AVAILABLE = True
 except ImportError:
     PSUTIL_AVAILABLE = False
-    print("Warning: psutil module not found. Window tracking will be limited.")
+    print("Warning: psutil module not found. Window tracking will be limited.", file=sys.stderr)
+
+# numpy only speeds up heatmap colors, so there is nothing to warn about without it
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+DEFAULT_INACTIVITY_THRESHOLD = 5  # Seconds of inactivity before stopping timer
+
+# Key and click listeners run on separate threads, so history records can be
+# slightly out of timestamp order; readers look this many seconds past a boundary
+HISTORY_REORDER_WINDOW = 60
+
+# Timestamp at the start of a record as written by FileSink, for scanning without a full parse
+HISTORY_TS_PATTERN = re.compile(rb'^\{"ts": (-?[0-9.eE+-]+)[,}]')
+
+# Activity intensity (fraction of the peak) where the MED and HIGH color bands start
+INTENSITY_MED = 0.3
+INTENSITY_HIGH = 0.7
+
+# Week-by-minute heatmap: one column per hour of the week, one row per minute
+HEATMAP_COLUMNS = 7 * 24
+HEATMAP_ROWS = 60
+
+def format_duration(seconds):
+    """Format seconds into hours:minutes:seconds"""
+    hours, remainder = divmod(seconds, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
+
+class EventSink:
+    """Base class for destinations that receive batches of activity events"""
+    def write_batch(self, events):
+        """Write a list of event dicts to the destination"""
+        raise NotImplementedError
+
+    def close(self):
+        """Release any resources held by the sink"""
+        pass
+
+class StdoutSink(EventSink):
+    """Stream events to stdout as JSON lines"""
+    def write_batch(self, events):
+        sys.stdout.write("".join(json.dumps(event) + "\n" for event in events))
+        sys.stdout.flush()
+
+class FileSink(EventSink):
+    """Append events to a JSON-lines file"""
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def write_batch(self, events):
+        # Open lazily so the file is only touched from the sink's worker thread
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.write("".join(json.dumps(event) + "\n" for event in events))
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class SQLiteSink(EventSink):
+    """Insert events into an SQLite database"""
+    def __init__(self, path):
+        self.path = path
+        self.conn = None
+
+    def write_batch(self, events):
+        # sqlite3 connections are bound to the thread that created them
+        if self.conn is None:
+            self.conn = sqlite3.connect(self.path)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS events "
+                              "(ts REAL, type TEXT, window TEXT, user TEXT)")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS events_ts ON events (ts)")
+        rows = [(e["ts"], e["type"], e["window"], e["user"]) for e in events]
+        with self.conn:
+            self.conn.executemany("INSERT INTO events VALUES (?, ?, ?, ?)", rows)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+class SocketSink(EventSink):
+    """Send events as JSON lines over a TCP connection"""
+    def __init__(self, host, port, timeout=5.0):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.sock = None
+
+    def write_batch(self, events):
+        if self.sock is None:
+            self.sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        data = "".join(json.dumps(event) + "\n" for event in events).encode("utf-8")
+        try:
+            self.sock.sendall(data)
+        except OSError:
+            # Drop the connection so the next batch reconnects
+            self.close()
+            raise
+
+    def close(self):
+        if self.sock is not None:
+            try:
+                self.sock.close()
+            except OSError:
+                pass
+            self.sock = None
+
+class SinkWorker:
+    """Feed one sink from its own bounded queue on a background thread"""
+    OVERFLOW_POLICIES = ("drop-oldest", "block", "sample")
+
+    def __init__(self, name, sink, queue_size=10000, batch_size=100, flush_interval=1.0,
+                 overflow="drop-oldest", block_timeout=0.05, sample_every=10):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        if flush_interval <= 0:
+            raise ValueError(f"Flush interval must be positive, got {flush_interval}")
+        self.name = name
+        self.sink = sink
+        self.queue_size = max(1, queue_size)
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_timeout = block_timeout  # Longest a producer may wait under "block"
+        self.sample_every = max(1, sample_every)  # Keep 1 of N events under "sample"
+
+        self.queue = deque()
+        self.cond = threading.Condition()
+        self.stopping = False
+        self.thread = None
+
+        # Counters exposed through stats()
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.errors = 0
+        self.overflow_seen = 0
+        self.last_batch_lag = 0.0
+        self.started_at = time.time()
+
+    def start(self):
+        """Start the worker thread"""
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self.run, name=f"sink-{self.name}")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def put(self, event):
+        """Queue an event, applying the overflow policy if the queue is full"""
+        with self.cond:
+            if len(self.queue) >= self.queue_size:
+                if self.overflow == "block":
+                    # Wait briefly for the worker, but never stall input ingestion for long
+                    self.cond.wait_for(lambda: len(self.queue) < self.queue_size or self.stopping,
+                                       timeout=self.block_timeout)
+                    if len(self.queue) >= self.queue_size:
+                        self.dropped += 1
+                        return False
+                elif self.overflow == "sample":
+                    # Only every Nth overflowing event displaces the oldest one
+                    self.overflow_seen += 1
+                    if self.overflow_seen % self.sample_every:
+                        self.dropped += 1
+                        return False
+                    self.queue.popleft()
+                    self.dropped += 1
+                else:  # drop-oldest
+                    self.queue.popleft()
+                    self.dropped += 1
+
+            self.queue.append(event)
+            self.enqueued += 1
+            if len(self.queue) >= self.batch_size:
+                self.cond.notify_all()
+            return True
+
+    def run(self):
+        """Drain the queue in batches until stopped"""
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: len(self.queue) >= self.batch_size or self.stopping,
+                                   timeout=self.flush_interval)
+                if not self.queue:
+                    if self.stopping:
+                        break
+                    continue
+                count = min(self.batch_size, len(self.queue))
+                batch = [self.queue.popleft() for _ in range(count)]
+                # Wake any producer blocked on a full queue
+                self.cond.notify_all()
+
+            try:
+                self.sink.write_batch(batch)
+                self.written += len(batch)
+                self.batches += 1
+                self.last_batch_lag = time.time() - batch[0]["ts"]
+            except Exception as e:
+                self.errors += 1
+                # put() updates the same counter from producer threads
+                with self.cond:
+                    self.dropped += len(batch)
+                print(f"Error writing to sink {self.name}: {e}", file=sys.stderr)
+
+        try:
+            self.sink.close()
+        except Exception as e:
+            print(f"Error closing sink {self.name}: {e}", file=sys.stderr)
+
+    def request_stop(self):
+        """Ask the worker to flush remaining events and exit, without waiting"""
+        with self.cond:
+            self.stopping = True
+            self.cond.notify_all()
+
+    def stop(self, timeout=5.0):
+        """Flush remaining events and stop the worker thread"""
+        self.request_stop()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def stats(self):
+        """Return throughput, lag and counters for this sink"""
+        now = time.time()
+        with self.cond:
+            queued = len(self.queue)
+            oldest = self.queue[0]["ts"] if self.queue else None
+        uptime = now - self.started_at
+        return {
+            "sink": self.name,
+            "overflow": self.overflow,
+            "queued": queued,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "errors": self.errors,
+            "throughput": self.written / uptime if uptime > 0 else 0.0,  # Events per second
+            "lag": now - oldest if oldest is not None else 0.0,  # Age of oldest queued event
+            "last_batch_lag": self.last_batch_lag,
+        }
+
+def format_sink_stats(stats):
+    """Summarize one sink's stats on a single line"""
+    return (f"SINK {stats['sink']}: {stats['written']} WRITTEN, {stats['dropped']} DROPPED, "
+            f"{stats['errors']} ERRORS, {stats['throughput']:.1f}/S, LAG {stats['lag']:.1f}S")
+
+class SinkPipeline:
+    """Fan activity events out to a set of sink workers"""
+    def __init__(self, workers=None):
+        self.workers = list(workers or [])
+
+    def start(self):
+        for worker in self.workers:
+            worker.start()
+
+    def emit(self, event):
+        """Hand an event to every sink without waiting on any of them"""
+        for worker in self.workers:
+            worker.put(event)
+
+    def stop(self, timeout=5.0):
+        """Stop all workers, waiting at most timeout seconds in total for them to flush"""
+        for worker in self.workers:
+            worker.request_stop()
+        deadline = time.time() + timeout
+        for worker in self.workers:
+            if worker.thread is not None:
+                worker.thread.join(max(0.0, deadline - time.time()))
+
+    def stats(self):
+        return [worker.stats() for worker in self.workers]
+
+def parse_sink_spec(spec):
+    """Build a SinkWorker from a spec like 'file:out.jsonl,batch=200,overflow=block'"""
+    target, *options = spec.split(",")
+    kind, _, location = target.partition(":")
+
+    if kind == "stdout":
+        sink = StdoutSink()
+    elif kind == "file":
+        sink = FileSink(location or "keytime_history.jsonl")
+    elif kind == "sqlite":
+        sink = SQLiteSink(location or "keytime_history.db")
+    elif kind == "socket":
+        host, _, port = location.rpartition(":")
+        if not host or not port.isdigit():
+            raise ValueError(f"Socket sink needs host:port, got '{location}'")
+        sink = SocketSink(host, int(port))
+    else:
+        raise ValueError(f"Unknown sink type: {kind}")
+
+    # Per-sink queue, batching and overflow settings
+    option_names = {
+        "queue": ("queue_size", int),
+        "batch": ("batch_size", int),
+        "interval": ("flush_interval", float),
+        "overflow": ("overflow", str),
+        "timeout": ("block_timeout", float),
+        "sample": ("sample_every", int),
+    }
+    kwargs = {}
+    for option in options:
+        key, _, value = option.partition("=")
+        if key not in option_names:
+            raise ValueError(f"Unknown sink option: {key}")
+        name, convert = option_names[key]
+        kwargs[name] = convert(value)
+
+    return SinkWorker(target, sink, **kwargs)
 
 class KeyTime:
-    def __init__(self, root):
+    def __init__(self, root, pipeline=None):
         self.root = root
         self.root.title("KeyTime")
         self.root.geometry("600x500")
@@ -47,12 +377,16 @@ class KeyTime:
         self.is_typing = False
         self.last_keypress_time = None
         self.last_status_change_time = datetime.now()
-        self.inactivity_threshold = 5  # Seconds of inactivity before stopping timer
+        self.inactivity_threshold = DEFAULT_INACTIVITY_THRESHOLD
         self.stop_threads = False
         self.start_time = datetime.now()
         self.keypress_history = [0] * 60  # For the keypress histogram (60 seconds)
         self.keystroke_count = 0  # Count keypresses for visualization
         
+        # Per-minute input counts for the current week, feeding the heatmap
+        self.week_start = self.get_week_start(datetime.now())
+        self.activity_buckets = array('I', bytes(4 * HEATMAP_COLUMNS * HEATMAP_ROWS))
+        
         # Window tracking
         self.window_activity = {}
         self.current_window = "NONE"
@@ -66,16 +400,36 @@ class KeyTime:
         self.last_tree_update = time.time()
         self.visualization_update_interval = 1.0
         self.last_visualization_update = time.time()
+        self.heatmap_update_interval = 5.0
+        self.last_heatmap_update = 0
+        
+        # Heatmap render state so only new columns are redrawn
+        self.heatmap_cell_size = None
+        self.heatmap_week_start = None
+        self.heatmap_scale = 0  # Count drawn as full intensity
+        self.heatmap_next_column = 0
         
         # Active tab tracking to reduce unnecessary updates
         self.active_tab = 0
         
+        # Exporters fed with raw input events, kept off the GUI update path
+        self.pipeline = pipeline or SinkPipeline()
+        self.user = self.get_user_name()
+        
         # Create GUI elements
         self.setup_gui()
         
         # Start the keyboard listener and timer update threads
         self.start_threads()
     
+    def get_user_name(self):
+        """Get the login name recorded with exported events"""
+        try:
+            return getpass.getuser()
+        except (KeyError, OSError):
+            # No USER/LOGNAME and no passwd entry for this UID
+            return "UNKNOWN"
+    
     def setup_styles(self):
         """Set up the Matrix-themed styles for all widgets"""
         self.style = ttk.Style()
@@ -127,6 +481,10 @@ class KeyTime:
         visualization_frame = ttk.Frame(self.notebook)
         self.notebook.add(visualization_frame, text="VISUALIZE")
         
+        # Heatmap tab
+        heatmap_frame = ttk.Frame(self.notebook)
+        self.notebook.add(heatmap_frame, text="HEATMAP")
+        
         # Track tab changes
         self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
@@ -138,6 +496,9 @@ class KeyTime:
         
         # Visualization setup
         self.setup_visualization_tab(visualization_frame)
+        
+        # Heatmap setup
+        self.setup_heatmap_tab(heatmap_frame)
     
     def on_tab_changed(self, event):
         """Track which tab is currently active"""
@@ -257,6 +618,11 @@ class KeyTime:
         session_start = self.start_time.strftime("%H:%M:%S")
         self.session_label = ttk.Label(summary_frame, text=f"SESSION INITIATED: {session_start}", style="TLabel")
         self.session_label.pack(anchor=tk.W, pady=2)
+        
+        # Export throughput and lag, one line per configured sink
+        self.sink_stats_label = ttk.Label(summary_frame, text="", style="TLabel", justify=tk.LEFT)
+        if self.pipeline.workers:
+            self.sink_stats_label.pack(anchor=tk.W, pady=2)
     
     def setup_visualization_tab(self, parent):
         """Set up the visualization tab contents"""
@@ -305,6 +671,38 @@ class KeyTime:
         self.cpm_label = ttk.Label(stats_frame, text="CLICKS/MIN: 0", style="TLabel")
         self.cpm_label.pack(side=tk.LEFT, padx=20)
     
+    def setup_heatmap_tab(self, parent):
+        """Set up the heatmap tab contents"""
+        # Title
+        title_label = ttk.Label(parent, text="WEEKLY ACTIVITY HEATMAP", style="Header.TLabel")
+        title_label.pack(pady=(0, 15))
+        
+        heatmap_frame = ttk.LabelFrame(parent, text="KEYS + CLICKS PER MINUTE")
+        heatmap_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # The whole heatmap is a single image item on the canvas
+        self.heatmap_canvas = tk.Canvas(heatmap_frame, bg=self.matrix_black,
+                                        highlightbackground=self.matrix_dark_green,
+                                        highlightthickness=1)
+        self.heatmap_canvas.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        
+        # Cells are drawn at one pixel each, then zoomed onto the displayed image
+        self.heatmap_cells = tk.PhotoImage(width=HEATMAP_COLUMNS, height=HEATMAP_ROWS)
+        self.heatmap_image = tk.PhotoImage(width=1, height=1)
+        self.heatmap_canvas.create_image(0, 0, anchor=tk.NW, image=self.heatmap_image, tags="heatmap")
+        
+        # Legend
+        legend_frame = ttk.Frame(parent)
+        legend_frame.pack(fill=tk.X, pady=5)
+        
+        ttk.Label(legend_frame, text="COLUMN = HOUR, ROW = MINUTE  ", style="TLabel").pack(side=tk.LEFT, padx=5)
+        ttk.Label(legend_frame, text="LOW", foreground=self.matrix_dark_green,
+                 background=self.matrix_black).pack(side=tk.LEFT, padx=5)
+        ttk.Label(legend_frame, text="MED", foreground=self.matrix_green,
+                 background=self.matrix_black).pack(side=tk.LEFT, padx=5)
+        ttk.Label(legend_frame, text="HIGH", foreground="#FFFFFF",
+                 background=self.matrix_black).pack(side=tk.LEFT, padx=5)
+    
     def update_status(self, active):
         """Update the active/inactive status and related counters"""
         current_time = datetime.now()
@@ -330,9 +728,7 @@ class KeyTime:
     
     def format_time(self, seconds):
         """Format seconds into hours:minutes:seconds"""
-        hours, remainder = divmod(seconds, 3600)
-        minutes, seconds = divmod(remainder, 60)
-        return f"{int(hours):02d}:{int(minutes):02d}:{int(seconds):02d}"
+        return format_duration(seconds)
     
     def get_active_window_name(self):
         """Get the name of the currently active window"""
@@ -398,10 +794,14 @@ class KeyTime:
     def simulate_key_press(self):
         """Simulate a keypress when pynput is not available"""
         if random.random() < 0.3:  # 30% chance of a keypress each second
-            self.on_key_press(None)
+            self.handle_key_press(simulated=True)
     
     def on_key_press(self, key):
         """Callback function for key press events"""
+        self.handle_key_press(simulated=False)
+    
+    def handle_key_press(self, simulated):
+        """Record a real or simulated key press"""
         current_time = datetime.now()
         
         # Get current window name
@@ -411,9 +811,14 @@ class KeyTime:
         # Increment keystroke counter
         self.keystroke_count += 1
         
+        # Hand real events to any configured sinks; simulated ones only drive the display
+        if not simulated:
+            self.emit_event("key", current_time, window_name)
+        
         # Update activity histogram
         current_second = int(current_time.timestamp()) % 60
         self.keypress_history[current_second] += 1
+        self.record_activity(current_time.timestamp())
         
         if not self.is_typing:
             # Start timing if not already timing
@@ -439,6 +844,88 @@ class KeyTime:
             # Update last keypress time
             self.last_keypress_time = current_time
     
+    def emit_event(self, event_type, event_time, window_name):
+        """Send an input event to the sink pipeline"""
+        if self.pipeline.workers:
+            self.pipeline.emit({
+                "ts": event_time.timestamp(),
+                "type": event_type,
+                "window": window_name,
+                "user": self.user,
+            })
+    
+    def get_week_start(self, now):
+        """Return the timestamp of midnight on the Monday of the given week"""
+        monday = now.date() - timedelta(days=now.weekday())
+        return datetime.combine(monday, datetime.min.time()).timestamp()
+    
+    def get_bucket_index(self, ts):
+        """Map a timestamp to its minute bucket, starting a new week when needed"""
+        moment = datetime.fromtimestamp(ts)
+        week_start = self.get_week_start(moment)
+        if week_start > self.week_start:
+            self.week_start = week_start
+            self.activity_buckets = array('I', bytes(4 * HEATMAP_COLUMNS * HEATMAP_ROWS))
+        elif week_start < self.week_start:
+            return -1  # Belongs to an earlier week
+        
+        return self.get_minute_of_week(moment)
+    
+    def get_minute_of_week(self, moment):
+        """Return the bucket for a local time"""
+        # Use the local wall clock so DST weeks still have 168 hour columns that match the day labels
+        return moment.weekday() * 24 * 60 + moment.hour * 60 + moment.minute
+    
+    def record_activity(self, ts):
+        """Count an input event in the heatmap's minute buckets"""
+        index = self.get_bucket_index(ts)
+        buckets = self.activity_buckets
+        if 0 <= index < len(buckets):
+            buckets[index] += 1
+    
+    def load_heatmap_history(self):
+        """Fill this week's buckets from history written by a file or sqlite sink"""
+        week_start = self.week_start
+        # Events since startup are already counted live
+        session_start = self.start_time.timestamp()
+        counts = array('I', bytes(4 * HEATMAP_COLUMNS * HEATMAP_ROWS))
+        
+        for worker in self.pipeline.workers:
+            path = getattr(worker.sink, "path", None)
+            if path is None or not os.path.exists(path):
+                continue
+            try:
+                if is_sqlite_history(path):
+                    # Let SQLite pre-aggregate the events per minute
+                    conn = sqlite3.connect(path)
+                    try:
+                        rows = conn.execute("SELECT CAST(ts / 60 AS INTEGER) * 60, COUNT(*) FROM events "
+                                            "WHERE ts >= ? AND ts < ? AND user = ? GROUP BY 1",
+                                            (week_start, session_start, self.user)).fetchall()
+                    finally:
+                        conn.close()
+                else:
+                    rows = ((ts, 1) for ts, _, _, user in iter_history(path, week_start, session_start)
+                            if user == self.user)
+                
+                for ts, count in rows:
+                    moment = datetime.fromtimestamp(ts)
+                    if self.get_week_start(moment) == week_start:
+                        counts[self.get_minute_of_week(moment)] += count
+            except (OSError, sqlite3.Error) as e:
+                print(f"Error loading history from {path}: {e}", file=sys.stderr)
+            # One history source is enough
+            break
+        
+        # Merge into the live buckets unless the week rolled over while loading
+        if self.week_start == week_start:
+            buckets = self.activity_buckets
+            for index, count in enumerate(counts):
+                if count:
+                    buckets[index] += count
+            # Force a full repaint
+            self.heatmap_cell_size = None
+    
     def on_click(self, x, y, button, pressed):
         """Callback function for mouse click events"""
         if pressed:
@@ -449,6 +936,9 @@ class KeyTime:
             window_name = self.get_active_window_name()
             self.current_window = window_name
             
+            self.emit_event("click", current_time, window_name)
+            self.record_activity(current_time.timestamp())
+            
             if not self.is_typing:
                 self.is_typing = True
                 self.last_keypress_time = current_time
@@ -532,13 +1022,7 @@ class KeyTime:
                 continue
                 
             # Calculate color intensity based on value
-            intensity = min(value / max_value, 1.0)
-            if intensity < 0.3:
-                color = self.matrix_dark_green
-            elif intensity < 0.7:
-                color = self.matrix_green
-            else:
-                color = "#FFFFFF"  # Very active is white
+            color = self.intensity_color(min(value / max_value, 1.0))
             
             x1 = i * bar_width
             y1 = canvas_height - bar_height
@@ -566,6 +1050,95 @@ class KeyTime:
             cpm = self.total_clicks / elapsed_minutes
         self.cpm_label.config(text=f"CLICKS/MIN: {cpm:.1f}")
     
+    def intensity_color(self, intensity):
+        """Map an activity intensity between 0 and 1 to its color band"""
+        if intensity < INTENSITY_MED:
+            return self.matrix_dark_green
+        elif intensity < INTENSITY_HIGH:
+            return self.matrix_green
+        return "#FFFFFF"  # Very active is white
+    
+    def heatmap_colors(self, counts, max_value):
+        """Compute the color of every heatmap cell in one pass over the bucket counts"""
+        if NUMPY_AVAILABLE:
+            values = np.frombuffer(counts, dtype=np.uint32)
+            intensity = values / max_value
+            bands = np.select([values == 0, intensity < INTENSITY_MED, intensity < INTENSITY_HIGH],
+                              [0, 1, 2], default=3)
+            palette = np.array([self.matrix_black, self.matrix_dark_green, self.matrix_green, "#FFFFFF"])
+            return palette[bands].tolist()
+        
+        return [self.intensity_color(value / max_value) if value else self.matrix_black for value in counts]
+    
+    def update_heatmap(self):
+        """Blit new heatmap columns to the heatmap image"""
+        if self.active_tab != 3:  # Heatmap tab is index 3
+            return
+        
+        current_time = time.time()
+        if current_time - self.last_heatmap_update < self.heatmap_update_interval:
+            return
+        
+        self.last_heatmap_update = current_time
+        
+        canvas_width = self.heatmap_canvas.winfo_width()
+        canvas_height = self.heatmap_canvas.winfo_height()
+        
+        if canvas_width <= 1 or canvas_height <= 1:
+            # Canvas not ready yet
+            return
+        
+        # Leave room below the image for the day labels
+        cell_size = (max(1, canvas_width // HEATMAP_COLUMNS), max(1, (canvas_height - 20) // HEATMAP_ROWS))
+        current_column = max(0, self.get_bucket_index(current_time) // HEATMAP_ROWS)
+        buckets = self.activity_buckets
+        max_value = max(buckets) or 1
+        
+        # Intensities are relative to a stored scale that only moves once the peak has doubled,
+        # so a new peak minute does not repaint the hours already drawn
+        if (cell_size != self.heatmap_cell_size or self.week_start != self.heatmap_week_start
+                or max_value >= 2 * self.heatmap_scale):
+            self.draw_heatmap_axes(cell_size)
+            self.heatmap_scale = max_value
+            first_column, last_column = 0, HEATMAP_COLUMNS
+        else:
+            # Counts above the scale draw in the top band until the next full repaint
+            first_column, last_column = self.heatmap_next_column, current_column + 1
+        
+        self.heatmap_cell_size = cell_size
+        self.heatmap_week_start = self.week_start
+        # The current hour is still filling up, so it is redrawn next time
+        self.heatmap_next_column = current_column
+        
+        if first_column >= last_column:
+            return
+        
+        # Colors come back column by column, each column holding HEATMAP_ROWS minutes
+        colors = self.heatmap_colors(buckets[first_column * HEATMAP_ROWS:last_column * HEATMAP_ROWS],
+                                     self.heatmap_scale)
+        rows = ["{" + " ".join(colors[row::HEATMAP_ROWS]) + "}" for row in range(HEATMAP_ROWS)]
+        self.heatmap_cells.put(" ".join(rows), to=(first_column, 0))
+        
+        # Scale the changed columns onto the displayed image in a single copy
+        cell_width, cell_height = cell_size
+        self.heatmap_image.tk.call(self.heatmap_image, "copy", self.heatmap_cells,
+                                   "-from", first_column, 0, last_column, HEATMAP_ROWS,
+                                   "-to", first_column * cell_width, 0,
+                                   "-zoom", cell_width, cell_height)
+    
+    def draw_heatmap_axes(self, cell_size):
+        """Resize the heatmap image and redraw the day labels"""
+        cell_width, cell_height = cell_size
+        self.heatmap_image.configure(width=HEATMAP_COLUMNS * cell_width, height=HEATMAP_ROWS * cell_height)
+        
+        self.heatmap_canvas.delete("axes")
+        for day, name in enumerate(["MON", "TUE", "WED", "THU", "FRI", "SAT", "SUN"]):
+            x = day * 24 * cell_width
+            y = HEATMAP_ROWS * cell_height
+            self.heatmap_canvas.create_line(x, y, x, y + 5, fill=self.matrix_green, tags="axes")
+            self.heatmap_canvas.create_text(x + 2, y + 12, text=name, anchor=tk.W, fill=self.matrix_green,
+                                            font=("Courier New", 8), tags="axes")
+    
     def update_window_tree(self):
         """Update the window statistics treeview"""
         # Skip updates if stats tab isn't visible
@@ -658,9 +1231,17 @@ class KeyTime:
                 elif self.active_tab == 1:  # Stats tab
                     # Update window statistics
                     self.update_window_tree()
+                    
+                    # Update export statistics
+                    if self.pipeline.workers:
+                        lines = [format_sink_stats(stats) for stats in self.pipeline.stats()]
+                        self.sink_stats_label.config(text="\n".join(lines))
                 elif self.active_tab == 2:  # Visualization tab
                     # Update visualization
                     self.update_visualization()
+                elif self.active_tab == 3:  # Heatmap tab
+                    # Update heatmap
+                    self.update_heatmap()
             
             # Sleep for a shorter time to improve responsiveness
             time.sleep(0.1)
@@ -680,7 +1261,15 @@ class KeyTime:
                 self.mouse_listener.daemon = True
                 self.mouse_listener.start()
             except Exception as e:
-                print(f"Error starting input listeners: {e}")
+                print(f"Error starting input listeners: {e}", file=sys.stderr)
+        
+        # Start sink workers
+        self.pipeline.start()
+        
+        # Seed the heatmap with this week's recorded history without delaying startup
+        self.history_thread = threading.Thread(target=self.load_heatmap_history)
+        self.history_thread.daemon = True
+        self.history_thread.start()
         
         # Start inactivity checker thread
         self.inactivity_thread = threading.Thread(target=self.check_inactivity)
@@ -705,16 +1294,343 @@ class KeyTime:
                     self.mouse_listener.stop()
             except:
                 pass
+        
+        # Flush queued events to the sinks and report how each one did
+        self.pipeline.stop()
+        for stats in self.pipeline.stats():
+            print(format_sink_stats(stats), file=sys.stderr)
             
         self.root.destroy()
 
+def is_sqlite_history(path):
+    """Tell SQLite sink output apart from JSON-lines sink output by the file header"""
+    with open(path, "rb") as f:
+        return f.read(16) == b"SQLite format 3\x00"
+
+def parse_history_line(line):
+    """Parse one JSON-lines history record, returning None if it is not a usable event"""
+    try:
+        event = json.loads(line)
+    except ValueError:
+        # Blank lines and records torn by an interrupted write
+        return None
+    if (not isinstance(event, dict) or not isinstance(event.get("ts"), (int, float))
+            or "type" not in event or "window" not in event):
+        return None
+    return event
+
+def read_history_record(f):
+    """Read lines until a valid JSON-lines event is found, or return None at end of file"""
+    for line in f:
+        event = parse_history_line(line)
+        if event is not None:
+            return event
+    return None
+
+def history_time_range(path):
+    """Return the (first, last) event timestamps in a history file, or None if it is empty"""
+    if is_sqlite_history(path):
+        conn = sqlite3.connect(path)
+        try:
+            first, last = conn.execute("SELECT MIN(ts), MAX(ts) FROM events").fetchone()
+        finally:
+            conn.close()
+        return None if first is None else (first, last)
+
+    # Reading a day seeks by binary search, which is only valid for a file in time order.
+    # Concatenated exports from several machines are not, so check every record once.
+    first = last = None
+    with open(path, "rb") as f:
+        for line_number, line in enumerate(f, 1):
+            match = HISTORY_TS_PATTERN.match(line)
+            if match:
+                ts = float(match.group(1))
+            else:
+                event = parse_history_line(line)
+                if event is None:
+                    continue
+                ts = event["ts"]
+
+            if last is not None and ts < last - HISTORY_REORDER_WINDOW:
+                raise ValueError(f"{path} is not in time order at line {line_number}; "
+                                 f"pass history files from different machines as separate inputs")
+            first = ts if first is None else min(first, ts)
+            last = ts if last is None else max(last, ts)
+    return None if first is None else (first, last)
+
+def seek_history(f, ts):
+    """Binary search a chronological JSON-lines file for the first record at or after ts"""
+    lo, hi = 0, f.seek(0, os.SEEK_END)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if mid > 0:
+            # Align to the first line starting at or after mid
+            f.seek(mid - 1)
+            f.readline()
+        else:
+            f.seek(0)
+        event = read_history_record(f)
+        if event is None or event["ts"] >= ts:
+            hi = mid
+        else:
+            lo = mid + 1
+
+    if lo > 0:
+        f.seek(lo - 1)
+        f.readline()
+    else:
+        f.seek(0)
+
+def iter_history(path, start, end, chunk_size=10000):
+    """Yield (ts, type, window, user) tuples for events in [start, end) in chunks"""
+    if is_sqlite_history(path):
+        conn = sqlite3.connect(path)
+        try:
+            cursor = conn.execute("SELECT ts, type, window, user FROM events "
+                                  "WHERE ts >= ? AND ts < ? ORDER BY ts", (start, end))
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+        return
+
+    with open(path, "rb") as f:
+        # Records near the boundaries may have been written out of order
+        seek_history(f, start - HISTORY_REORDER_WINDOW)
+        while True:
+            lines = f.readlines(chunk_size * 100)  # Roughly chunk_size records per read
+            if not lines:
+                break
+            for line in lines:
+                event = parse_history_line(line)
+                if event is None:
+                    continue
+                ts = event["ts"]
+                if ts >= end + HISTORY_REORDER_WINDOW:
+                    return
+                if ts < start or ts >= end:
+                    continue
+                yield ts, event["type"], event["window"], event.get("user", "UNKNOWN")
+
+def iter_histories(paths, start, end, chunk_size=10000):
+    """Yield events in [start, end) from several history files, merged by timestamp"""
+    if len(paths) == 1:
+        return iter_history(paths[0], start, end, chunk_size)
+    return heapq.merge(*(iter_history(path, start, end, chunk_size) for path in paths),
+                       key=lambda event: event[0])
+
+def aggregate_day(task):
+    """Rebuild active intervals for one local day of history and total them per group
+
+    Returns the day, the totals keyed by (user, group), and each user's first and
+    last event so gaps that cross midnight can be stitched in by the caller.
+    """
+    paths, day, threshold, group_by, chunk_size = task
+    day_start = datetime.combine(day, datetime.min.time())
+    start = day_start.timestamp()
+    end = (day_start + timedelta(days=1)).timestamp()
+    hour_starts = [(day_start + timedelta(hours=h)).timestamp() for h in range(24)]
+
+    totals = {}  # (user, group) -> [active seconds, keys, clicks]
+    firsts = {}  # user -> (ts, group key of the first event)
+    lasts = {}  # user -> ts of the last event
+
+    for ts, event_type, window, user in iter_histories(paths, start, end, chunk_size):
+        if group_by == "window":
+            key = (user, window)
+        elif group_by == "hour":
+            key = (user, max(0, bisect.bisect_right(hour_starts, ts) - 1))
+        else:
+            key = (user,)
+
+        entry = totals.get(key)
+        if entry is None:
+            entry = totals[key] = [0.0, 0, 0]
+        if event_type == "click":
+            entry[2] += 1
+        else:
+            entry[1] += 1
+
+        # Same rule as the live tracker: gaps under the threshold count as active time
+        # for the program that received the later event
+        previous = lasts.get(user)
+        if previous is None:
+            firsts[user] = (ts, key)
+        elif 0 <= ts - previous < threshold:
+            entry[0] += ts - previous
+        # A late record must not move the user's clock backwards, or the next gap counts twice
+        lasts[user] = ts if previous is None else max(previous, ts)
+
+    return day, totals, firsts, lasts
+
+class ReportWriter:
+    """Write report rows incrementally as CSV or JSON lines"""
+    def __init__(self, stream, output_format, group_by):
+        self.stream = stream
+        self.output_format = output_format
+        self.group_by = group_by
+        self.columns = ["period", "user"]
+        if group_by != "day":
+            self.columns.append(group_by)
+        self.columns += ["active_seconds", "active_time", "keys", "clicks"]
+
+        if output_format == "csv":
+            self.csv_writer = csv.writer(stream)
+            self.csv_writer.writerow(self.columns)
+
+    def write_period(self, period, totals):
+        """Write all rows for a finished period, grouped by user"""
+        if self.group_by == "hour":
+            rows = sorted(totals.items())
+        else:
+            # Busiest programs first, like the METRICS tab
+            rows = sorted(totals.items(), key=lambda item: (item[0][0], -item[1][0]))
+        for key, (active, keys, clicks) in rows:
+            values = [period, *key, round(active, 3), format_duration(active), keys, clicks]
+            if self.output_format == "csv":
+                self.csv_writer.writerow(values)
+            else:
+                self.stream.write(json.dumps(dict(zip(self.columns, values))) + "\n")
+        self.stream.flush()
+
+def report_days(first_ts, last_ts, date_from=None, date_to=None):
+    """List the local days covered by the history, limited to the requested range"""
+    day = datetime.fromtimestamp(first_ts).date()
+    last_day = datetime.fromtimestamp(last_ts).date()
+    if date_from is not None:
+        day = max(day, date_from)
+    if date_to is not None:
+        last_day = min(last_day, date_to)
+
+    days = []
+    while day <= last_day:
+        days.append(day)
+        day += timedelta(days=1)
+    return days
+
+def run_report(args):
+    """Stream a daily or weekly activity report over recorded history"""
+    ranges = [time_range for time_range in map(history_time_range, args.inputs) if time_range is not None]
+    if not ranges:
+        print(f"No events found in {', '.join(args.inputs)}", file=sys.stderr)
+        return
+    time_range = (min(first for first, _ in ranges), max(last for _, last in ranges))
+
+    days = report_days(*time_range, args.date_from, args.date_to)
+    tasks = [(args.inputs, day, args.threshold, args.by, args.chunk_size) for day in days]
+
+    stream = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    pool = None
+    try:
+        writer = ReportWriter(stream, args.format, args.by)
+        if args.processes > 1 and len(tasks) > 1:
+            pool = multiprocessing.Pool(min(args.processes, len(tasks)))
+            results = pool.imap(aggregate_day, tasks)
+        else:
+            results = map(aggregate_day, tasks)
+
+        # Only the current period's totals and each user's last event are kept in memory
+        previous_lasts = {}
+        period, period_totals = None, {}
+        for day, totals, firsts, lasts in results:
+            for user, (ts, key) in firsts.items():
+                previous = previous_lasts.get(user)
+                if previous is not None and 0 <= ts - previous < args.threshold:
+                    totals[key][0] += ts - previous
+            for user, ts in lasts.items():
+                previous_lasts[user] = max(previous_lasts.get(user, ts), ts)
+
+            if args.period == "weekly":
+                year, week, _ = day.isocalendar()
+                day_period = f"{year}-W{week:02d}"
+            else:
+                day_period = day.isoformat()
+
+            if day_period != period:
+                if period_totals:
+                    writer.write_period(period, period_totals)
+                period, period_totals = day_period, {}
+
+            for key, (active, keys, clicks) in totals.items():
+                entry = period_totals.get(key)
+                if entry is None:
+                    period_totals[key] = [active, keys, clicks]
+                else:
+                    entry[0] += active
+                    entry[1] += keys
+                    entry[2] += clicks
+
+        if period_totals:
+            writer.write_period(period, period_totals)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if stream is not sys.stdout:
+            stream.close()
+
+def parse_date(value):
+    """Parse a YYYY-MM-DD command line date"""
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(prog="keytime", description="KeyTime activity tracker")
+    parser.add_argument("--sink", action="append", default=[], metavar="SPEC",
+                        help="export events to a sink: stdout, file:PATH, sqlite:PATH or socket:HOST:PORT, "
+                             "followed by optional ,queue=N,batch=N,interval=SECS,overflow=drop-oldest|block|sample,"
+                             "timeout=SECS,sample=N (timeout is the longest wait under block, "
+                             "sample keeps 1 of N overflowing events)")
+
+    subparsers = parser.add_subparsers(dest="command")
+    report = subparsers.add_parser("report", help="summarize history recorded by a file or sqlite sink")
+    report.add_argument("inputs", nargs="+", metavar="input",
+                        help="history files (JSON lines from a file sink or SQLite from a sqlite sink); "
+                             "files from several machines are merged per day")
+    report.add_argument("--period", choices=["daily", "weekly"], default="daily")
+    report.add_argument("--by", choices=["window", "hour", "day"], default="window",
+                        help="group active time per program, per hour of day, or per day only")
+    report.add_argument("--format", choices=["csv", "json"], default="csv",
+                        help="csv, or json for one JSON object per line")
+    report.add_argument("--output", default="-", help="output file (default: stdout)")
+    report.add_argument("--from", dest="date_from", type=parse_date, metavar="YYYY-MM-DD")
+    report.add_argument("--to", dest="date_to", type=parse_date, metavar="YYYY-MM-DD")
+    report.add_argument("--threshold", type=float, default=DEFAULT_INACTIVITY_THRESHOLD,
+                        help="seconds of inactivity that end an active interval")
+    report.add_argument("--processes", type=int, default=1,
+                        help="aggregate day partitions in this many processes")
+    report.add_argument("--chunk-size", type=int, default=10000,
+                        help="events read from history per chunk")
+    return parser.parse_args(argv)
+
 if __name__ == "__main__":
+    args = parse_args()
+    if args.command == "report":
+        try:
+            run_report(args)
+        except (OSError, sqlite3.Error, ValueError) as e:
+            print(f"Error generating report: {e}", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(0)
+
+    try:
+        pipeline = SinkPipeline([parse_sink_spec(spec) for spec in args.sink])
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(2)
+    
     try:
         root = tk.Tk()
-        app = KeyTime(root)
+        app = KeyTime(root, pipeline)
         root.protocol("WM_DELETE_WINDOW", app.on_closing)
         root.mainloop()
     except Exception as e:
-        print(f"Error starting KeyTime: {e}")
+        print(f"Error starting KeyTime: {e}", file=sys.stderr)
         import traceback
         traceback.print_exc()
\ No newline at end of file
@@ -0,0 +1,247 @@
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+import run
+
+# A Wednesday, so the current hour of the week is column 2 * 24 + 10
+WEDNESDAY = datetime(2026, 10, 14, 10, 30)
+WEDNESDAY_COLUMN = 58
+
+
+class FakeCanvas:
+    def __init__(self, width, height):
+        self.width, self.height = width, height
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def delete(self, *tags):
+        pass
+
+    def create_line(self, *args, **kwargs):
+        pass
+
+    def create_text(self, *args, **kwargs):
+        pass
+
+
+class FakeImage:
+    """Records puts and zoomed copies instead of drawing them"""
+    def __init__(self):
+        self.tk = self
+        self.puts = []
+        self.copies = []
+
+    def put(self, data, to):
+        self.puts.append(to)
+
+    def configure(self, **kwargs):
+        pass
+
+    def call(self, image, command, source, *args):
+        # args: -from x1 y1 x2 y2 -to x y -zoom zx zy
+        self.copies.append((args[1], args[3]))
+
+
+def make_heatmap(now):
+    """A KeyTime with heatmap state but no display"""
+    app = run.KeyTime.__new__(run.KeyTime)
+    app.matrix_green, app.matrix_dark_green, app.matrix_black = "#00FF41", "#008F11", "#0D0208"
+    app.active_tab = 3
+    app.heatmap_update_interval = 0
+    app.last_heatmap_update = 0
+    app.heatmap_cell_size = None
+    app.heatmap_week_start = None
+    app.heatmap_scale = 0
+    app.heatmap_next_column = 0
+    app.week_start = app.get_week_start(now)
+    app.activity_buckets = run.array('I', bytes(4 * run.HEATMAP_COLUMNS * run.HEATMAP_ROWS))
+    app.heatmap_canvas = FakeCanvas(3 * run.HEATMAP_COLUMNS, 20 + 4 * run.HEATMAP_ROWS)
+    app.heatmap_cells = FakeImage()
+    app.heatmap_image = FakeImage()
+    return app
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Pin time.time() to a settable local datetime"""
+    current = {"now": WEDNESDAY}
+    monkeypatch.setattr(run.time, "time", lambda: current["now"].timestamp())
+    return current
+
+
+def test_update_heatmap_redraws_only_new_columns(clock):
+    app = make_heatmap(WEDNESDAY)
+    for _ in range(10):
+        app.record_activity(WEDNESDAY.timestamp())
+
+    app.update_heatmap()
+    assert app.heatmap_image.copies == [(0, run.HEATMAP_COLUMNS)]
+    assert app.heatmap_scale == 10
+
+    # A new peak below double the scale only redraws the current hour
+    for _ in range(9):
+        app.record_activity(WEDNESDAY.timestamp() + 60)
+    app.update_heatmap()
+    assert app.heatmap_image.copies[-1] == (WEDNESDAY_COLUMN, WEDNESDAY_COLUMN + 1)
+    assert app.heatmap_cells.puts[-1] == (WEDNESDAY_COLUMN, 0)
+    assert app.heatmap_scale == 10
+
+    # Two hours later the unfinished hour and the new ones are drawn
+    clock["now"] = datetime(2026, 10, 14, 12, 10)
+    app.update_heatmap()
+    assert app.heatmap_image.copies[-1] == (WEDNESDAY_COLUMN, WEDNESDAY_COLUMN + 3)
+
+
+def test_update_heatmap_repaints_when_peak_doubles(clock):
+    app = make_heatmap(WEDNESDAY)
+    app.record_activity(WEDNESDAY.timestamp())
+    app.update_heatmap()
+
+    app.record_activity(WEDNESDAY.timestamp())
+    app.update_heatmap()
+    assert app.heatmap_image.copies[-1] == (0, run.HEATMAP_COLUMNS)
+    assert app.heatmap_scale == 2
+
+
+def test_update_heatmap_repaints_on_resize(clock):
+    app = make_heatmap(WEDNESDAY)
+    app.update_heatmap()
+    app.heatmap_canvas.width *= 2
+    app.update_heatmap()
+    assert app.heatmap_image.copies == [(0, run.HEATMAP_COLUMNS)] * 2
+    assert app.heatmap_cell_size == (6, 4)
+
+
+def test_minute_of_week_uses_the_wall_clock():
+    app = make_heatmap(WEDNESDAY)
+    assert app.get_minute_of_week(datetime(2026, 10, 12, 0, 0)) == 0
+    assert app.get_minute_of_week(WEDNESDAY) == WEDNESDAY_COLUMN * 60 + 30
+    assert app.get_minute_of_week(datetime(2026, 10, 18, 23, 59)) == len(app.activity_buckets) - 1
+
+
+def test_bucket_index_starts_new_week_and_ignores_earlier_weeks():
+    app = make_heatmap(WEDNESDAY)
+    app.record_activity(WEDNESDAY.timestamp())
+
+    next_monday = datetime(2026, 10, 19, 0, 5)
+    assert app.get_bucket_index(next_monday.timestamp()) == 5
+    assert app.week_start == datetime(2026, 10, 19).timestamp()
+    assert sum(app.activity_buckets) == 0
+
+    assert app.get_bucket_index(WEDNESDAY.timestamp()) == -1
+    app.record_activity(WEDNESDAY.timestamp())
+    assert sum(app.activity_buckets) == 0
+
+
+@pytest.fixture
+def new_york():
+    """Run in a timezone whose DST ends on Sunday 2026-11-01"""
+    if not hasattr(time, "tzset"):
+        pytest.skip("time.tzset is not available")
+    saved = os.environ.get("TZ")
+    os.environ["TZ"] = "America/New_York"
+    time.tzset()
+    yield
+    if saved is None:
+        del os.environ["TZ"]
+    else:
+        os.environ["TZ"] = saved
+    time.tzset()
+
+
+def test_dst_fall_back_week_stays_in_range(new_york):
+    # This week has 169 hours, so the last hour of Sunday used to index past the buckets
+    monday = datetime(2026, 10, 26)
+    assert datetime(2026, 11, 2).timestamp() - monday.timestamp() == 169 * 3600
+
+    app = make_heatmap(monday)
+    late_sunday = datetime(2026, 11, 1, 23, 30)
+    app.record_activity(late_sunday.timestamp())
+    assert app.activity_buckets[6 * 24 * 60 + 23 * 60 + 30] == 1
+    assert app.week_start == monday.timestamp()
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_heatmap_colors_match_histogram_bands(monkeypatch, use_numpy):
+    if use_numpy and not run.NUMPY_AVAILABLE:
+        pytest.skip("numpy is not installed")
+    monkeypatch.setattr(run, "NUMPY_AVAILABLE", use_numpy)
+    app = make_heatmap(WEDNESDAY)
+
+    counts = run.array('I', [0, 1, 2, 3, 5, 6, 7, 9, 10, 15])
+    colors = app.heatmap_colors(counts, 10)
+    assert colors[0] == app.matrix_black
+    assert colors[1:] == [app.intensity_color(value / 10) for value in counts[1:]]
+    assert colors[1:] == [app.matrix_dark_green] * 2 + [app.matrix_green] * 3 + ["#FFFFFF"] * 4
+
+
+@pytest.mark.parametrize("sink_kind", ["file", "sqlite"])
+def test_load_heatmap_history_merges_earlier_events(tmp_path, sink_kind):
+    app = make_heatmap(WEDNESDAY)
+    app.user = "u"
+    app.start_time = WEDNESDAY
+    minute = WEDNESDAY - timedelta(minutes=30)
+    events = [
+        {"ts": (minute - timedelta(days=7)).timestamp(), "user": "u"},  # Last week
+        {"ts": minute.timestamp(), "user": "u"},
+        {"ts": minute.timestamp() + 10, "user": "u"},
+        {"ts": minute.timestamp() + 20, "user": "other"},
+        {"ts": WEDNESDAY.timestamp() + 5, "user": "u"},  # Already counted live
+    ]
+    for event in events:
+        event.update(type="key", window="A")
+
+    path = tmp_path / f"history.{'jsonl' if sink_kind == 'file' else 'db'}"
+    worker = run.parse_sink_spec(f"{sink_kind}:{path}")
+    worker.sink.write_batch(events)
+    worker.sink.close()
+    app.pipeline = run.SinkPipeline([worker])
+
+    app.activity_buckets[0] = 4  # Live count that must survive the merge
+    app.heatmap_cell_size = (3, 4)
+    app.load_heatmap_history()
+
+    assert app.activity_buckets[app.get_minute_of_week(minute)] == 2
+    assert app.activity_buckets[0] == 4
+    assert sum(app.activity_buckets) == 6
+    assert app.heatmap_cell_size is None
+
+
+@pytest.fixture
+def tk_root():
+    try:
+        root = run.tk.Tk()
+    except run.tk.TclError:
+        pytest.skip("no display available")
+    yield root
+    root.destroy()
+
+
+def test_full_week_heatmap_renders_within_50ms(tk_root, clock):
+    app = make_heatmap(WEDNESDAY)
+    frame = run.ttk.Frame(tk_root)
+    frame.pack(fill=run.tk.BOTH, expand=True)
+    app.setup_heatmap_tab(frame)
+    tk_root.geometry("600x500")
+    tk_root.update()
+
+    random.seed(1)
+    for index in range(len(app.activity_buckets)):
+        app.activity_buckets[index] = random.randint(0, 200)
+
+    start = time.perf_counter()
+    app.update_heatmap()
+    tk_root.update_idletasks()
+    elapsed = time.perf_counter() - start
+
+    assert app.heatmap_cell_size is not None
+    assert app.heatmap_image.width() == run.HEATMAP_COLUMNS * app.heatmap_cell_size[0]
+    assert elapsed < 0.05
@@ -0,0 +1,158 @@
+import json
+import types
+from datetime import date, datetime
+
+import pytest
+
+import run
+
+MIDNIGHT = datetime(2026, 10, 2).timestamp()
+
+
+def write_history(path, records, extra_lines=(), user="u"):
+    """Write (ts, type) records as JSON lines, inserting extra_lines after the given indexes"""
+    extra = dict(extra_lines)
+    with open(path, "w", encoding="utf-8") as f:
+        for i, (ts, event_type) in enumerate(records):
+            f.write(json.dumps({"ts": ts, "type": event_type, "window": "A", "user": user}) + "\n")
+            if i in extra:
+                f.write(extra[i])
+
+
+def line_offsets(path):
+    """Byte offset of every line start, plus the end of the file"""
+    offsets, offset = [], 0
+    with open(path, "rb") as f:
+        for line in f:
+            offsets.append(offset)
+            offset += len(line)
+    return offsets + [offset]
+
+
+def report_args(*paths, **overrides):
+    args = dict(inputs=[str(path) for path in paths], date_from=None, date_to=None, threshold=5, by="day",
+                chunk_size=100, output="-", format="csv", processes=1, period="daily")
+    args.update(overrides)
+    return types.SimpleNamespace(**args)
+
+
+def test_seek_history_finds_first_record_at_or_after_ts(tmp_path):
+    path = tmp_path / "h.jsonl"
+    records = [(1000.0 + i, "key") for i in range(50)]
+    write_history(path, records)
+    offsets = line_offsets(path)
+
+    with open(path, "rb") as f:
+        for target in (0, 1000, 1010.5, 1049, 2000):
+            run.seek_history(f, target)
+            expected = next((i for i, (ts, _) in enumerate(records) if ts >= target), len(records))
+            assert f.tell() == offsets[expected]
+
+
+def test_seek_history_skips_torn_lines(tmp_path):
+    path = tmp_path / "h.jsonl"
+    records = [(1000.0 + i, "key") for i in range(20)]
+    write_history(path, records, extra_lines=[(9, '{"ts": 1009.5, "ty\n'), (14, "\n")])
+
+    with open(path, "rb") as f:
+        run.seek_history(f, 1010)
+        # The seek may stop on the torn line itself; readers skip it
+        assert run.read_history_record(f)["ts"] == 1010.0
+
+
+def test_iter_history_keeps_late_records_on_their_own_day(tmp_path):
+    path = tmp_path / "h.jsonl"
+    m = MIDNIGHT
+    write_history(path, [(m - 3, "key"), (m - 2, "key"), (m + 0.5, "key"),
+                         (m - 0.2, "click"), (m + 1, "key"), (m + 2, "key")])
+
+    before = [ts for ts, *_ in run.iter_history(str(path), m - 86400, m)]
+    after = [ts for ts, *_ in run.iter_history(str(path), m, m + 86400)]
+    assert before == [m - 3, m - 2, m - 0.2]
+    assert after == [m + 0.5, m + 1, m + 2]
+
+
+def test_iter_history_skips_malformed_records(tmp_path):
+    path = tmp_path / "h.jsonl"
+    write_history(path, [(MIDNIGHT + i, "key") for i in range(3)],
+                  extra_lines=[(0, '{"a": 1}\n[1]\nnull\n'), (1, '{"ts": "x", "type": "key", "window": "A"}\n')])
+
+    events = list(run.iter_history(str(path), MIDNIGHT, MIDNIGHT + 60))
+    assert [ts for ts, *_ in events] == [MIDNIGHT, MIDNIGHT + 1, MIDNIGHT + 2]
+    assert run.history_time_range(str(path)) == (MIDNIGHT, MIDNIGHT + 2)
+
+
+def test_sqlite_history_detected_by_header(tmp_path):
+    path = tmp_path / "history.log"
+    sink = run.SQLiteSink(str(path))
+    sink.write_batch([{"ts": MIDNIGHT + 1, "type": "key", "window": "A", "user": "u"}])
+    sink.close()
+
+    assert run.is_sqlite_history(str(path))
+    assert list(run.iter_history(str(path), MIDNIGHT, MIDNIGHT + 60)) == [(MIDNIGHT + 1, "key", "A", "u")]
+
+
+def test_aggregate_day_returns_stitching_edges(tmp_path):
+    path = tmp_path / "h.jsonl"
+    m = MIDNIGHT
+    write_history(path, [(m + 10, "key"), (m + 12, "click"), (m + 11, "key"), (m + 14, "key")])
+
+    day, totals, firsts, lasts = run.aggregate_day(([str(path)], date(2026, 10, 2), 5, "day", 100))
+    assert day == date(2026, 10, 2)
+    # The late m+11 record must not make the m+14 gap count from m+11
+    assert totals[("u",)] == [pytest.approx(4.0), 3, 1]
+    assert firsts == {"u": (m + 10, ("u",))}
+    assert lasts == {"u": m + 14}
+
+
+def test_report_stitches_gaps_across_midnight(tmp_path, capsys):
+    path = tmp_path / "h.jsonl"
+    m = MIDNIGHT
+    write_history(path, [(m - 3, "key"), (m - 2, "key"), (m + 0.5, "key"),
+                         (m - 0.2, "click"), (m + 1, "key"), (m + 2, "key")])
+
+    run.run_report(report_args(path))
+    rows = [line.split(",") for line in capsys.readouterr().out.splitlines()[1:]]
+    assert [(row[0], float(row[2])) for row in rows] == [("2026-10-01", pytest.approx(2.8)),
+                                                          ("2026-10-02", pytest.approx(2.2))]
+
+    run.run_report(report_args(path, period="weekly", format="json"))
+    row = json.loads(capsys.readouterr().out)
+    assert row["active_seconds"] == pytest.approx(5.0)
+    assert (row["keys"], row["clicks"]) == (5, 1)
+
+
+def daily_records(days, start_hour):
+    """Three keys a second apart at start_hour on each of the given October days"""
+    return [(datetime(2026, 10, day, start_hour).timestamp() + i, "key") for day in days for i in range(3)]
+
+
+def test_report_merges_history_from_several_machines(tmp_path, capsys):
+    u_path, v_path = tmp_path / "u.jsonl", tmp_path / "v.jsonl"
+    write_history(u_path, daily_records(range(1, 4), 9), user="u")
+    write_history(v_path, daily_records(range(1, 4), 10), user="v")
+
+    run.run_report(report_args(u_path, v_path))
+    rows = [line.split(",")[:3] for line in capsys.readouterr().out.splitlines()[1:]]
+    assert rows == [[f"2026-10-0{day}", user, "2.0"] for day in range(1, 4) for user in ("u", "v")]
+
+
+def test_report_merges_one_user_across_files(tmp_path, capsys):
+    # The same user on two machines: gaps are taken between the merged events
+    first, second = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    write_history(first, [(MIDNIGHT + 100, "key"), (MIDNIGHT + 102, "key")])
+    write_history(second, [(MIDNIGHT + 101, "click"), (MIDNIGHT + 103, "key")])
+
+    run.run_report(report_args(first, second))
+    assert capsys.readouterr().out.splitlines()[1].split(",")[2:] == ["3.0", "00:00:03", "3", "1"]
+
+
+def test_report_rejects_concatenated_history(tmp_path):
+    u_path, v_path = tmp_path / "u.jsonl", tmp_path / "v.jsonl"
+    write_history(u_path, daily_records(range(1, 4), 9), user="u")
+    write_history(v_path, daily_records(range(1, 4), 10), user="v")
+    fleet = tmp_path / "fleet.jsonl"
+    fleet.write_bytes(u_path.read_bytes() + v_path.read_bytes())
+
+    with pytest.raises(ValueError, match="not in time order at line 10"):
+        run.run_report(report_args(fleet))
@@ -0,0 +1,99 @@
+import inspect
+import time
+
+import pytest
+
+import run
+
+
+def make_event(n):
+    return {"ts": time.time(), "type": "key", "window": "A", "user": "u", "n": n}
+
+
+@pytest.mark.parametrize("overflow, kept, enqueued", [
+    ("drop-oldest", [2, 3, 4], 5),
+    ("block", [0, 1, 2], 3),
+    ("sample", [1, 2, 4], 4),
+])
+def test_sink_worker_overflow_policies(overflow, kept, enqueued):
+    # Not started, so nothing drains the queue
+    worker = run.SinkWorker("test", run.EventSink(), queue_size=3, overflow=overflow,
+                            block_timeout=0.01, sample_every=2)
+    for n in range(5):
+        worker.put(make_event(n))
+
+    assert [event["n"] for event in worker.queue] == kept
+    stats = worker.stats()
+    assert (stats["queued"], stats["enqueued"], stats["dropped"]) == (3, enqueued, 2)
+
+
+class ListSink(run.EventSink):
+    def __init__(self):
+        self.batches = []
+
+    def write_batch(self, events):
+        self.batches.append([event["n"] for event in events])
+
+
+def test_sink_worker_flushes_batches_on_stop():
+    sink = ListSink()
+    worker = run.SinkWorker("test", sink, batch_size=2, flush_interval=60)
+    worker.start()
+    for n in range(5):
+        worker.put(make_event(n))
+    worker.stop()
+
+    assert [n for batch in sink.batches for n in batch] == [0, 1, 2, 3, 4]
+    assert all(len(batch) <= 2 for batch in sink.batches)
+    assert worker.stats()["written"] == 5
+
+
+def test_parse_sink_spec_rejects_bad_specs():
+    worker = run.parse_sink_spec("file:out.jsonl,batch=5,overflow=sample")
+    assert isinstance(worker.sink, run.FileSink)
+    assert (worker.batch_size, worker.overflow) == (5, "sample")
+
+    for spec in ("foo", "socket:nohost", "file:x,bogus=1", "file:x,overflow=nope",
+                 "file:x,interval=0", "file:x,interval=-1"):
+        with pytest.raises(ValueError):
+            run.parse_sink_spec(spec)
+
+
+def make_tracker(worker):
+    """A KeyTime with just enough state to handle input events, without a display"""
+    app = run.KeyTime.__new__(run.KeyTime)
+    app.pipeline = run.SinkPipeline([worker])
+    app.user = "u"
+    app.current_window = "A"
+    app.last_window_check_time = time.time()
+    app.window_check_interval = 60
+    app.keystroke_count = 0
+    app.keypress_history = [0] * 60
+    app.week_start = app.get_week_start(run.datetime.now())
+    app.activity_buckets = run.array('I', bytes(4 * run.HEATMAP_COLUMNS * run.HEATMAP_ROWS))
+    app.is_typing = False
+    app.inactivity_threshold = run.DEFAULT_INACTIVITY_THRESHOLD
+    app.total_typing_time = 0
+    app.window_activity = {}
+    return app
+
+
+def test_only_real_key_presses_reach_sinks():
+    # pynput passes (key, injected) to callbacks that accept two arguments
+    assert list(inspect.signature(run.KeyTime.on_key_press).parameters) == ["self", "key"]
+
+    worker = run.SinkWorker("test", run.EventSink())
+    app = make_tracker(worker)
+    app.on_key_press("a")
+    app.handle_key_press(simulated=True)
+
+    assert app.keystroke_count == 2
+    assert [event["type"] for event in worker.queue] == ["key"]
+
+
+def test_user_name_falls_back_when_login_is_unknown(monkeypatch):
+    def no_user():
+        raise KeyError("getpwuid(): uid not found")
+
+    monkeypatch.setattr(run.getpass, "getuser", no_user)
+    assert run.KeyTime.__new__(run.KeyTime).get_user_name() == "UNKNOWN"